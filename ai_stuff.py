@@ -5,12 +5,14 @@ import chromadb
 # Core LlamaIndex imports
 from llama_index.core import Settings, SimpleDirectoryReader
 from llama_index.core.schema import Document
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
 from llama_index.core.node_parser import HierarchicalNodeParser
 from llama_index.core.storage import StorageContext
 
 # Vector store related imports
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core import VectorStoreIndex
+from mmap_store import MmapVectorStore
 
 # LLM and embedding related imports
 from llama_index.llms.openai import OpenAI
@@ -19,10 +21,13 @@ from llama_index.postprocessor.jinaai_rerank import JinaRerank
 
 # Utility imports
 import re
+import hashlib
+import functools
 import concurrent.futures
 from tqdm import tqdm
 import multiprocessing
 from openai_helpers import make_openai_call
+from document_table import DocumentTable
 
 SYSTEM_PROMPT = """You are an expert AI assistant specializing in testosterone, TRT, and sports medicine research. Follow these guidelines:
 
@@ -50,12 +55,52 @@ SYSTEM_PROMPT = """You are an expert AI assistant specializing in testosterone,
 
 Remember: Users are seeking expert knowledge. Focus on accuracy and clarity rather than general medical disclaimers which the users are already aware of."""
 
+# Section tags in the order detect_semantic_sections checks them. Compact chunks store
+# their sections as a bitmask over this list, so decoding in bit order keeps the ranking.
+SECTION_TAGS = [
+    'research_background', 'methodology', 'results', 'discussion',
+    'training', 'nutrition', 'protocol',
+    'medical_condition', 'treatment', 'side_effects',
+    'research', 'meta_analysis', 'mechanism_of_action',
+    'general',
+]
+
+# Keys carried by compact chunks, none of which mean anything to the embedder or the LLM
+COMPACT_CHUNK_KEYS = [
+    'doc_key', 'sections', 'chunk_index', 'total_chunks', 'level', 'next_chunk_id', 'prev_chunk_id',
+]
+
+# Every add rewrites the memory-mapped matrices, so bulk loads go through the Chroma export
+MMAP_REBUILD_MESSAGE = "Build the index with 'make chat' using VECTOR_STORE=chroma, then run 'make clean-mmap' and 'make export-mmap'."
+
+# Only read on the query path, so skip creating the table and directory
+document_table = DocumentTable(read_only=True)
+
+class RehydrateMetadataPostprocessor(BaseNodePostprocessor):
+    """Expands compact chunk metadata so the reranker and LLM see the source and sections."""
+
+    @classmethod
+    def class_name(cls):
+        return "RehydrateMetadataPostprocessor"
+
+    def _postprocess_nodes(self, nodes, query_bundle=None):
+        for node_with_score in nodes:
+            node_with_score.node.metadata = rehydrate_metadata(node_with_score.node.metadata)
+        return nodes
+
 def setup():
     """Initializes the environment and loads configuration settings."""
 
-    client = chromadb.PersistentClient(path="./chroma_db")
-    collection = client.get_or_create_collection("my_collection")
-    vector_store = ChromaVectorStore(chroma_collection=collection)
+    if os.getenv("VECTOR_STORE", "chroma") == "mmap":
+        vector_store = MmapVectorStore(
+            persist_dir="./mmap_store",
+            quantization=os.getenv("VECTOR_QUANTIZATION", "none"),
+            rescore_multiplier=int(os.getenv("VECTOR_RESCORE_MULTIPLIER", "0")) or None,
+        )
+    else:
+        client = chromadb.PersistentClient(path="./chroma_db")
+        collection = client.get_or_create_collection("my_collection")
+        vector_store = ChromaVectorStore(chroma_collection=collection)
     Settings.llm = OpenAI(
         model="gpt-4o-mini",
         temperature=0.0,
@@ -71,6 +116,29 @@ def setup():
     )
     return StorageContext.from_defaults(vector_store=vector_store)
 
+def count_embeddings(vector_store):
+    """Returns the number of embeddings in either of the supported vector stores."""
+
+    if isinstance(vector_store, MmapVectorStore):
+        return vector_store.count()
+    return vector_store._collection.count()
+
+def export_to_mmap():
+    """Exports the existing Chroma collection into the memory-mapped vector store."""
+
+    client = chromadb.PersistentClient(path="./chroma_db")
+    collection = client.get_or_create_collection("my_collection")
+    if collection.count() == 0:
+        print("Chroma collection is empty. Please run 'make chat' first to build it.")
+        return
+
+    try:
+        store = MmapVectorStore.from_chroma_collection(collection, persist_dir="./mmap_store")
+    except ValueError as e:
+        print(f"Error exporting to mmap store: {str(e)}. Run 'make clean-mmap' first.")
+        return
+    print(f"Exported {store.count()} embeddings to ./mmap_store")
+
 def chat_session(storage_context):
     """Starts a chat session with the user."""
 
@@ -78,14 +146,19 @@ def chat_session(storage_context):
         print("No data found. Please run 'make scrape' first.")
         return
     
-    chroma_collection = storage_context.vector_store._collection
-    collection_count = chroma_collection.count()
+    collection_count = count_embeddings(storage_context.vector_store)
     
     jina_embeddings = JinaEmbedding(api_key=os.getenv("JINA_API_KEY"), top_n=10)
 
+    compact_metadata = os.getenv("COMPACT_METADATA", "false").lower() == "true"
+
+    if collection_count == 0 and isinstance(storage_context.vector_store, MmapVectorStore):
+        print(f"Memory-mapped store is empty. {MMAP_REBUILD_MESSAGE}")
+        return
+
     if collection_count == 0:
         print("Creating new index...")
-        documents = process_documents("data", 50)
+        documents = process_documents("data", 50, compact_metadata)
         Settings.num_output_threads = min(32, multiprocessing.cpu_count())
         index = VectorStoreIndex.from_documents(
             documents=documents,
@@ -102,8 +175,11 @@ def chat_session(storage_context):
             )
         except Exception as e:
             print(f"Error loading existing index: {str(e)}")
+            if isinstance(storage_context.vector_store, MmapVectorStore):
+                print(MMAP_REBUILD_MESSAGE)
+                return
             print("Creating new index instead...")
-            documents = process_documents("data", 50)
+            documents = process_documents("data", 50, compact_metadata)
             index = VectorStoreIndex.from_documents(
                 documents=documents,
                 embed_model=jina_embeddings,
@@ -119,7 +195,7 @@ def chat_session(storage_context):
         system_prompt=SYSTEM_PROMPT,
         node_relationships=True,
         similarity_top_k=10,
-        node_postprocessors=[jina_rerank],
+        node_postprocessors=[RehydrateMetadataPostprocessor(), jina_rerank],
         context_window=4096,
         include_source_metadata=True,
         response_mode="tree_summarize",
@@ -132,34 +208,32 @@ def chat_session(storage_context):
         if user_input.lower() in ['exit', 'quit']:
             break
         
-        print(f"\nSearching through {storage_context.vector_store._collection.count()} embeddings...")
+        print(f"\nSearching through {count_embeddings(storage_context.vector_store)} embeddings...")
         
         response = chat_engine.chat(user_input)
         
-        source_nodes = []
+        source_metadata = []
         if hasattr(response, 'source_nodes'):
-            source_nodes = response.source_nodes
             unique_sources = set()
-            filtered_nodes = []
-            for node in source_nodes:
-                source = node.metadata.get('source', '')
+            for node in response.source_nodes:
+                metadata = rehydrate_metadata(node.metadata)
+                source = metadata.get('source', '')
                 if source not in unique_sources:
                     unique_sources.add(source)
-                    filtered_nodes.append(node)
+                    source_metadata.append(metadata)
             
-            source_nodes = filtered_nodes
-            print(f"\nFound {len(source_nodes)} unique source nodes")
-            for i, node in enumerate(source_nodes):
+            print(f"\nFound {len(source_metadata)} unique source nodes")
+            for i, metadata in enumerate(source_metadata):
                 print(f"\nSource {i+1}:")
-                print(f"Metadata: {node.metadata}")
+                print(f"Metadata: {metadata}")
         else:
             print("\nNo source_nodes attribute found in response")
             
-        sources = [node.metadata.get('source', 'Unknown source') for node in source_nodes]
+        sources = [metadata.get('source', 'Unknown source') for metadata in source_metadata]
         formatted_response = f"{response.response}\n\nSources:\n" + "\n".join([f"- {source}" for source in sources])
         print("\nAssistant:", formatted_response)
 
-def process_documents(directory, batch_size):
+def process_documents(directory, batch_size, compact_metadata=False):
     """Processes documents in the specified directory."""
 
     reader = SimpleDirectoryReader(input_dir=directory, recursive=False)
@@ -170,7 +244,7 @@ def process_documents(directory, batch_size):
     
     cleaned_docs = []
     with concurrent.futures.ThreadPoolExecutor(max_workers=min(64, len(batches))) as executor:
-        futures = [executor.submit(process_document_batch, batch, node_parser) for batch in batches]
+        futures = [executor.submit(process_document_batch, batch, node_parser, compact_metadata) for batch in batches]
         for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Processing documents"):
             cleaned_docs.extend(future.result())
     
@@ -192,9 +266,12 @@ def create_enhanced_node_parser():
         include_prev_next_rel=True,
     )
 
-def process_document_batch(batch, node_parser):
+def process_document_batch(batch, node_parser, compact_metadata=False):
     """Processes a single batch of documents."""
 
+    if compact_metadata:
+        return process_document_batch_compact(batch, node_parser)
+
     batch_docs = [
         Document(
             text=doc.text,
@@ -221,6 +298,82 @@ def process_document_batch(batch, node_parser):
         for i, (doc, node) in enumerate(zip(batch_docs, nodes))
     ]
 
+def process_document_batch_compact(batch, node_parser):
+    """Processes a batch of documents, storing per-document metadata once in the document table.
+
+    Chunks only carry a short document key, a section bitmask and their position, which
+    rehydrate_metadata expands back into the same fields process_document_batch produces.
+    Neighbouring chunks are referenced by chunk_index, or -1 when they are not indexed.
+    """
+
+    documents = []
+    batch_docs = []
+    for doc in batch:
+        source = doc.metadata.get("file_path", "")
+        doc_key = make_doc_key(source)
+        documents.append((doc_key, {**extract_metadata(doc.text), "source": source}))
+        batch_docs.append(
+            Document(
+                text=doc.text,
+                metadata={"doc_key": doc_key},
+                excluded_embed_metadata_keys=COMPACT_CHUNK_KEYS,
+                excluded_llm_metadata_keys=COMPACT_CHUNK_KEYS,
+            )
+        )
+    DocumentTable().upsert_documents(documents)
+
+    nodes = node_parser.get_nodes_from_documents(batch_docs)
+
+    # Emit the same nodes as process_document_batch, whose zip keeps one node per document,
+    # so turning on compact metadata never changes what gets embedded
+    chunk_nodes = nodes[:len(batch_docs)]
+    chunk_indexes = {node.node_id: i for i, node in enumerate(chunk_nodes)}
+    return [
+        Document(
+            text=node.text,
+            metadata={
+                'doc_key': node.metadata['doc_key'],
+                'sections': encode_sections(detect_section_tags(node.text)),
+                'chunk_index': i,
+                'total_chunks': len(nodes),
+                'level': node.metadata.get('level', 0),
+                'next_chunk_id': chunk_indexes.get(node.next_node.node_id, -1) if node.next_node else -1,
+                'prev_chunk_id': chunk_indexes.get(node.prev_node.node_id, -1) if node.prev_node else -1,
+            },
+            excluded_embed_metadata_keys=COMPACT_CHUNK_KEYS,
+            excluded_llm_metadata_keys=COMPACT_CHUNK_KEYS,
+        )
+        for i, node in enumerate(chunk_nodes)
+    ]
+
+def make_doc_key(source):
+    """Creates a short, stable document key from the document source."""
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+def rehydrate_metadata(metadata):
+    """Expands compact chunk metadata into the full metadata, leaving full metadata untouched."""
+    if 'doc_key' not in metadata:
+        return metadata
+
+    return {
+        **(get_document_metadata(metadata['doc_key']) or {}),
+        **sections_to_metadata(decode_sections(metadata.get('sections', 0))),
+        **{key: value for key, value in metadata.items() if key not in ('doc_key', 'sections')},
+    }
+
+@functools.lru_cache(maxsize=1024)
+def get_document_metadata(doc_key):
+    """Looks up per-document metadata, cached since it never changes during a chat session."""
+    return document_table.get_document(doc_key)
+
+def encode_sections(sections):
+    """Encodes a list of section tags as a bitmask over SECTION_TAGS."""
+    return sum(1 << SECTION_TAGS.index(section) for section in sections)
+
+def decode_sections(bitmask):
+    """Decodes a section bitmask back into the ordered list of section tags."""
+    return [section for i, section in enumerate(SECTION_TAGS) if bitmask & (1 << i)]
+
 def extract_metadata(text):
     """Extracts metadata from the input text using OpenAI's LLM for enhanced classification."""
     basic_metadata = {
@@ -235,6 +388,10 @@ def extract_metadata(text):
 
 def detect_semantic_sections(text):
     """Detects semantic sections in the text using basic text analysis."""
+    return sections_to_metadata(detect_section_tags(text))
+
+def detect_section_tags(text):
+    """Detects the section tags of the text, most relevant first."""
     # Look for common section headers and keywords
     sections = []
     
@@ -275,7 +432,11 @@ def detect_semantic_sections(text):
     # Ensure we have at least one section
     if not sections:
         sections.append('general')
-        
+
+    return sections
+
+def sections_to_metadata(sections):
+    """Converts a list of section tags into the primary/secondary/tertiary metadata fields."""
     # Calculate confidence based on number of keyword matches
     total_matches = len(sections)
     
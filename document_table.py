@@ -0,0 +1,56 @@
+import json
+import os
+import sqlite3
+from typing import List, Optional, Tuple
+
+class DocumentTable:
+    def __init__(self, db_name: str = "documents.db", read_only: bool = False):
+        self.db_name = db_name
+        self.db_path = os.path.join("./db", db_name)
+        self.read_only = read_only
+        if not read_only:
+            self.init_db()
+
+    def init_db(self):
+        """Initializes the database in the ./db directory."""
+        db_dir = "./db"
+        os.makedirs(db_dir, exist_ok=True)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_key TEXT PRIMARY KEY,
+                    metadata TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+
+    def upsert_documents(self, documents: List[Tuple[str, dict]]) -> None:
+        """Store the per-document metadata once, keyed by document key."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO documents (doc_key, metadata)
+                VALUES (?, ?)
+                ON CONFLICT(doc_key) DO UPDATE SET
+                    metadata = excluded.metadata,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', [(doc_key, json.dumps(metadata)) for doc_key, metadata in documents])
+            conn.commit()
+
+    def get_document(self, doc_key: str) -> Optional[dict]:
+        """Get the metadata stored for a document key."""
+        if not os.path.exists(self.db_path):
+            return None
+
+        with sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT metadata FROM documents WHERE doc_key = ?', (doc_key,))
+            row = cursor.fetchone()
+
+            if not row:
+                return None
+
+            return json.loads(row[0])
@@ -1,6 +1,6 @@
 import sys
 from scrape import download_urls
-from ai_stuff import setup, chat_session
+from ai_stuff import setup, chat_session, export_to_mmap
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +12,8 @@ def main():
         elif sys.argv[1] == "chat":
             storage_context = setup()
             chat_session(storage_context)
+        elif sys.argv[1] == "export-mmap":
+            export_to_mmap()
         else:
             print("Invalid command. Use 'make help' to see available commands.")
             sys.exit(1)
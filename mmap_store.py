@@ -0,0 +1,444 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from typing import Any, List, NamedTuple, Optional
+
+import numpy as np
+from tqdm import tqdm
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Shortlist size, as a multiple of top_k, that quantized searches rescore exactly.
+# Sign bits lose far more information than int8, so binary needs a much wider shortlist.
+DEFAULT_RESCORE_MULTIPLIERS = {"int8": 10, "binary": 200}
+
+# Number of set bits for every possible byte, used for vectorized hamming distances
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+class _Generation(NamedTuple):
+    """One immutable version of the store: its directory and memory-mapped matrices."""
+    path: str
+    embeddings: np.ndarray
+    embeddings_int8: np.ndarray
+    scales: np.ndarray
+    embeddings_binary: np.ndarray
+
+    @property
+    def db_path(self) -> str:
+        return os.path.join(self.path, "metadata.db")
+
+    @property
+    def count(self) -> int:
+        return self.embeddings.shape[0]
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    A read-mostly vector store that keeps embeddings in memory-mapped NumPy matrices.
+
+    Embeddings are L2-normalized and saved as a float32 matrix, plus an int8 copy
+    (with per-row scales) and a sign-bit copy for quantized search. Node text and
+    metadata live in a small sqlite table and are only read for the final top-k.
+    Because the matrices are opened with mmap, opening the store is nearly instant
+    and the pages are shared between every process that opens the same directory.
+
+    Quantization is lossy and does not make queries faster: NumPy upcasts int8 blocks
+    to float32 before the matmul, and the sign-bit scan plus rescore costs more than
+    an exact float scan. Both only shrink the matrix scanned on every query, which
+    helps when the float32 matrix does not fit in the page cache.
+
+    Every write builds a new generation directory holding both the matrices and the
+    metadata table, then switches the CURRENT pointer file to it with one atomic
+    rename. Readers check the pointer before each query, so they never mix matrices
+    and rows from different versions. Writes are expected to come from one process.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = True
+
+    persist_dir: str = Field(default="./mmap_store")
+    quantization: str = Field(default="none")
+    rescore_multiplier: Optional[int] = Field(default=None)
+    block_size: int = Field(default=65_536)
+
+    _generation: Optional[_Generation] = PrivateAttr(default=None)
+    _write_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(
+        self,
+        persist_dir: str = "./mmap_store",
+        quantization: str = "none",
+        rescore_multiplier: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Invalid quantization, expected one of {QUANTIZATION_MODES}")
+        super().__init__(
+            persist_dir=persist_dir,
+            quantization=quantization,
+            rescore_multiplier=rescore_multiplier,
+            **kwargs,
+        )
+        os.makedirs(self.persist_dir, exist_ok=True)
+        self._refresh()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.persist_dir, "CURRENT")
+
+    def count(self) -> int:
+        """Returns the number of stored embeddings."""
+        generation = self._refresh()
+        return 0 if generation is None else generation.count
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        """
+        Appends nodes to the store.
+
+        Every call writes a whole new generation, so this is meant for occasional small
+        updates. Bulk loads should go through from_chroma_collection instead.
+        """
+        if not nodes:
+            return []
+
+        records = []
+        for node in nodes:
+            metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=self.flat_metadata)
+            records.append((
+                node.node_id,
+                node.ref_doc_id,
+                node.get_content(),
+                metadata,
+            ))
+        embeddings = np.array([node.get_embedding() for node in nodes], dtype=np.float32)
+        self._append(records, embeddings)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Deletes every node belonging to the given document."""
+        with self._write_lock:
+            generation = self._refresh()
+            if generation is None:
+                return
+
+            with _connect_readonly(generation.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT row, node_id, ref_doc_id, text, metadata FROM nodes ORDER BY row ASC')
+                kept = [row for row in cursor.fetchall() if row[2] != ref_doc_id]
+            if len(kept) == generation.count:
+                return
+
+            generation_dir = self._new_generation_dir()
+            with sqlite3.connect(os.path.join(generation_dir, "metadata.db")) as conn:
+                cursor = conn.cursor()
+                _create_nodes_table(cursor)
+                cursor.executemany('''
+                    INSERT INTO nodes (row, node_id, ref_doc_id, text, metadata)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(new_row, *row[1:]) for new_row, row in enumerate(kept)])
+                conn.commit()
+
+            kept_rows = np.array([row[0] for row in kept], dtype=np.int64)
+            _save_matrices(generation_dir, np.asarray(generation.embeddings[kept_rows]))
+            self._switch_generation(generation_dir)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Returns the top-k most similar nodes by cosine similarity."""
+        generation = self._refresh()
+        if query.query_embedding is None or generation is None or generation.count == 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        query_embedding = _normalize(np.asarray(query.query_embedding, dtype=np.float32))
+
+        if query.filters is not None:
+            # Filtered queries score every matching row exactly
+            candidates = self._filter_rows(generation, query.filters)
+            top_k = min(query.similarity_top_k, len(candidates))
+            rows, scores = _rescore(generation, query_embedding, candidates, top_k)
+        elif self.quantization == "none":
+            top_k = min(query.similarity_top_k, generation.count)
+            rows, scores = self._search_float(generation, query_embedding, top_k)
+        else:
+            top_k = min(query.similarity_top_k, generation.count)
+            rescore_multiplier = self.rescore_multiplier or DEFAULT_RESCORE_MULTIPLIERS[self.quantization]
+            shortlist_size = min(top_k * rescore_multiplier, generation.count)
+            if self.quantization == "int8":
+                shortlist = self._search_int8(generation, query_embedding, shortlist_size)
+            else:
+                shortlist = self._search_binary(generation, query_embedding, shortlist_size)
+            rows, scores = _rescore(generation, query_embedding, shortlist, top_k)
+
+        return _build_result(generation, rows, scores)
+
+    @classmethod
+    def from_chroma_collection(
+        cls,
+        collection: Any,
+        persist_dir: str = "./mmap_store",
+        batch_size: int = 1000,
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        """Exports every embedding, document and metadata entry of a Chroma collection into a new store."""
+        store = cls(persist_dir=persist_dir, **kwargs)
+        if store.count() > 0:
+            raise ValueError(f"{persist_dir} already contains embeddings")
+
+        records = []
+        embeddings = None
+        total = collection.count()
+        for offset in tqdm(range(0, total, batch_size), desc="Exporting Chroma collection"):
+            batch = collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch_size,
+                offset=offset,
+            )
+            if not batch["ids"]:
+                break
+
+            batch_embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.empty((total, batch_embeddings.shape[1]), dtype=np.float32)
+            embeddings[len(records):len(records) + len(batch_embeddings)] = batch_embeddings
+
+            for node_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                metadata = metadata or {}
+                records.append((node_id, metadata.get("ref_doc_id"), text, metadata))
+
+        if records:
+            store._append(records, embeddings[:len(records)])
+        return store
+
+    def _refresh(self) -> Optional[_Generation]:
+        """Reopens the matrices if another writer switched to a new generation, and returns the current one."""
+        try:
+            with open(self.pointer_path) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            self._generation = None
+            return None
+
+        path = os.path.join(self.persist_dir, name)
+        if self._generation is None or self._generation.path != path:
+            self._generation = _Generation(
+                path=path,
+                embeddings=np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r"),
+                embeddings_int8=np.load(os.path.join(path, "embeddings_int8.npy"), mmap_mode="r"),
+                scales=np.load(os.path.join(path, "scales.npy"), mmap_mode="r"),
+                embeddings_binary=np.load(os.path.join(path, "embeddings_binary.npy"), mmap_mode="r"),
+            )
+        return self._generation
+
+    def _append(self, records, embeddings: np.ndarray) -> None:
+        """Writes a new generation with the current rows followed by the new ones."""
+        with self._write_lock:
+            generation = self._refresh()
+            start = 0 if generation is None else generation.count
+
+            generation_dir = self._new_generation_dir()
+            db_path = os.path.join(generation_dir, "metadata.db")
+            if generation is not None:
+                shutil.copyfile(generation.db_path, db_path)
+
+            with sqlite3.connect(db_path) as conn:
+                cursor = conn.cursor()
+                _create_nodes_table(cursor)
+                cursor.executemany('''
+                    INSERT INTO nodes (row, node_id, ref_doc_id, text, metadata)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [
+                    (start + i, node_id, ref_doc_id, text, json.dumps(metadata))
+                    for i, (node_id, ref_doc_id, text, metadata) in enumerate(records)
+                ])
+                conn.commit()
+
+            embeddings = _normalize(embeddings)
+            if generation is not None:
+                embeddings = np.concatenate([generation.embeddings, embeddings])
+            _save_matrices(generation_dir, embeddings)
+            self._switch_generation(generation_dir)
+
+    def _new_generation_dir(self) -> str:
+        return tempfile.mkdtemp(prefix="gen-", dir=self.persist_dir)
+
+    def _switch_generation(self, generation_dir: str) -> None:
+        """Atomically points CURRENT at a fully written generation and removes stale ones."""
+        previous = self._generation.path if self._generation is not None else None
+
+        tmp_path = self.pointer_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(os.path.basename(generation_dir))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+
+        # Keep the previous generation around for readers that are mid-query
+        keep = {generation_dir, previous}
+        for name in os.listdir(self.persist_dir):
+            path = os.path.join(self.persist_dir, name)
+            if name.startswith("gen-") and path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+        self._refresh()
+
+    def _filter_rows(self, generation: _Generation, filters: MetadataFilters) -> np.ndarray:
+        """Returns the rows whose metadata matches every (or any, for OR) exact match filter."""
+        clauses, params = [], []
+        for metadata_filter in filters.filters:
+            if isinstance(metadata_filter, MetadataFilters) or metadata_filter.operator != FilterOperator.EQ:
+                raise ValueError("MmapVectorStore only supports exact match metadata filters")
+            clauses.append('json_extract(metadata, ?) = ?')
+            params.extend([f'$."{metadata_filter.key}"', metadata_filter.value])
+
+        if not clauses:
+            return np.arange(generation.count, dtype=np.int64)
+
+        joiner = " OR " if filters.condition == FilterCondition.OR else " AND "
+        with _connect_readonly(generation.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT row FROM nodes WHERE {joiner.join(clauses)}', params)
+            return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+    def _search_float(self, generation: _Generation, query_embedding: np.ndarray, k: int):
+        """Exact search over the float32 matrix."""
+        return self._blockwise_top_k(
+            generation,
+            lambda start, end: generation.embeddings[start:end] @ query_embedding,
+            k,
+        )
+
+    def _search_int8(self, generation: _Generation, query_embedding: np.ndarray, k: int) -> np.ndarray:
+        """Approximate search over the int8 matrix, returning a shortlist of rows."""
+        rows, _ = self._blockwise_top_k(
+            generation,
+            lambda start, end: (
+                (generation.embeddings_int8[start:end] @ query_embedding) * generation.scales[start:end]
+            ),
+            k,
+        )
+        return rows
+
+    def _search_binary(self, generation: _Generation, query_embedding: np.ndarray, k: int) -> np.ndarray:
+        """Approximate search by hamming distance over sign bits, returning a shortlist of rows."""
+        query_bits = np.packbits(query_embedding > 0)
+        rows, _ = self._blockwise_top_k(
+            generation,
+            lambda start, end: -_POPCOUNT[
+                np.bitwise_xor(generation.embeddings_binary[start:end], query_bits)
+            ].sum(axis=1, dtype=np.int32),
+            k,
+        )
+        return rows
+
+    def _blockwise_top_k(self, generation: _Generation, score_block, k: int):
+        """Scores the matrix block by block, keeping only a running top-k to bound memory."""
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, generation.count, self.block_size):
+            end = min(start + self.block_size, generation.count)
+            scores = np.asarray(score_block(start, end), dtype=np.float32)
+            rows = np.arange(start, end, dtype=np.int64)
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.argsort(-best_scores)
+        return best_rows[order], best_scores[order]
+
+
+def _create_nodes_table(cursor) -> None:
+    """Creates the metadata table if it doesn't exist."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS nodes (
+            row INTEGER PRIMARY KEY,
+            node_id TEXT UNIQUE NOT NULL,
+            ref_doc_id TEXT,
+            text TEXT,
+            metadata TEXT
+        )
+    ''')
+
+
+def _connect_readonly(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def _save_matrices(directory: str, embeddings: np.ndarray) -> None:
+    """Saves the float matrix and its quantized copies into a generation directory."""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    np.save(os.path.join(directory, "embeddings.npy"), embeddings.astype(np.float32))
+    np.save(os.path.join(directory, "embeddings_int8.npy"), np.round(embeddings / scales[:, None]).astype(np.int8))
+    np.save(os.path.join(directory, "scales.npy"), scales.astype(np.float32))
+    np.save(os.path.join(directory, "embeddings_binary.npy"), np.packbits(embeddings > 0, axis=1))
+
+
+def _rescore(generation: _Generation, query_embedding: np.ndarray, shortlist: np.ndarray, k: int):
+    """Ranks a shortlist of rows with exact float similarities."""
+    shortlist = np.sort(shortlist)
+    scores = generation.embeddings[shortlist] @ query_embedding
+    order = np.argsort(-scores)[:k]
+    return shortlist[order], scores[order]
+
+
+def _build_result(generation: _Generation, rows: np.ndarray, scores: np.ndarray) -> VectorStoreQueryResult:
+    """Loads text and metadata for the selected rows and rebuilds their nodes."""
+    rows = [int(row) for row in rows]
+    with _connect_readonly(generation.db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT row, node_id, text, metadata FROM nodes WHERE row IN ({",".join("?" * len(rows))})',
+            rows,
+        )
+        by_row = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    nodes, ids = [], []
+    for row in rows:
+        node_id, text, metadata = by_row[row]
+        node = metadata_dict_to_node(json.loads(metadata), text=text)
+        nodes.append(node)
+        ids.append(node_id)
+
+    return VectorStoreQueryResult(
+        nodes=nodes,
+        similarities=[float(score) for score in scores],
+        ids=ids,
+    )
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalizes a vector or each row of a matrix, so dot products are cosine similarities."""
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (embeddings / norms).astype(np.float32)
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document, MetadataMode
+
+import ai_stuff
+from ai_stuff import (
+    create_enhanced_node_parser,
+    decode_sections,
+    detect_section_tags,
+    detect_semantic_sections,
+    encode_sections,
+    make_doc_key,
+    process_document_batch,
+    rehydrate_metadata,
+)
+from document_table import DocumentTable
+
+SECTION_KEYS = [
+    'primary_section', 'primary_confidence',
+    'secondary_section', 'secondary_confidence',
+    'tertiary_section', 'tertiary_confidence',
+]
+
+def make_batch(words_per_doc):
+    # Every document repeats its own marker word, so a chunk's text tells which document it came from
+    return [
+        Document(
+            text=f"marker{k} training protocol study results. " * words_per_doc,
+            metadata={"file_path": f"/data/doc-{k}.md"},
+        )
+        for k in range(3)
+    ]
+
+def source_of(chunk):
+    return f"/data/doc-{chunk.text.split()[0][len('marker'):]}.md"
+
+@pytest.fixture(autouse=True)
+def in_tmp_dir(tmp_path, monkeypatch):
+    # DocumentTable always lives in ./db, so run each test in its own directory
+    monkeypatch.chdir(tmp_path)
+    ai_stuff.get_document_metadata.cache_clear()
+    yield
+    ai_stuff.get_document_metadata.cache_clear()
+
+@pytest.mark.parametrize("text,expected", [
+    ("nothing to see here", ['general']),
+    ("the protocol and dosage", ['methodology', 'protocol']),
+    ("a workout protocol with side effects", ['methodology', 'training', 'protocol', 'side_effects']),
+    ("abstract: a meta-analysis of the literature on mechanism", [
+        'research_background', 'meta_analysis', 'mechanism_of_action',
+    ]),
+])
+def test_section_bitmask_round_trip_keeps_order(text, expected):
+    tags = detect_section_tags(text)
+
+    assert tags == expected
+    assert decode_sections(encode_sections(tags)) == tags
+
+def test_make_doc_key_is_short_and_stable():
+    assert make_doc_key("/data/a.md") == make_doc_key("/data/a.md")
+    assert make_doc_key("/data/a.md") != make_doc_key("/data/b.md")
+    assert len(make_doc_key("/data/a.md")) == 12
+
+def test_document_table_round_trip():
+    table = DocumentTable()
+    table.upsert_documents([("a", {"source": "/data/a.md"}), ("b", {"source": "/data/b.md"})])
+    table.upsert_documents([("a", {"source": "/data/a2.md"})])
+
+    reader = DocumentTable(read_only=True)
+    assert reader.get_document("a") == {"source": "/data/a2.md"}
+    assert reader.get_document("b") == {"source": "/data/b.md"}
+    assert reader.get_document("missing") is None
+
+def test_read_only_document_table_does_not_create_the_db():
+    assert DocumentTable(read_only=True).get_document("a") is None
+    assert not os.path.exists("./db")
+
+def test_rehydrate_leaves_full_metadata_untouched():
+    metadata = {"source": "/data/a.md", "primary_section": "training"}
+    assert rehydrate_metadata(metadata) is metadata
+
+def test_compact_chunks_rehydrate_like_default_chunks():
+    node_parser = create_enhanced_node_parser()
+    batch = make_batch(600)
+
+    default_chunks = process_document_batch(batch, node_parser)
+    compact_chunks = process_document_batch(batch, node_parser, compact_metadata=True)
+
+    # The flag only changes the metadata, never how many chunks get embedded. Chunk texts can
+    # still differ slightly, since the splitter no longer spends chunk size on hidden metadata.
+    assert len(compact_chunks) == len(default_chunks)
+    for default_chunk, compact_chunk in zip(default_chunks, compact_chunks):
+        metadata = rehydrate_metadata(compact_chunk.metadata)
+        assert set(metadata) == set(default_chunk.metadata)
+        # total_chunks counts every parser node, which drops when chunks hold more text
+        for key in SECTION_KEYS + ['chunk_index', 'level']:
+            assert metadata[key] == default_chunk.metadata[key]
+        assert metadata['source'] == source_of(compact_chunk)
+
+def test_compact_chunks_are_small_and_hidden_from_the_llm():
+    chunks = process_document_batch(make_batch(50), SentenceSplitter(chunk_size=1024), compact_metadata=True)
+
+    for i, chunk in enumerate(chunks):
+        assert set(chunk.metadata) == set(ai_stuff.COMPACT_CHUNK_KEYS)
+        assert chunk.metadata['next_chunk_id'] in (i + 1, -1)
+        assert chunk.metadata['prev_chunk_id'] in (i - 1, -1)
+        assert chunk.get_metadata_str(MetadataMode.EMBED) == ""
+        assert chunk.get_metadata_str(MetadataMode.LLM) == ""
+
+@pytest.mark.parametrize("node_parser", [SentenceSplitter(chunk_size=1024), create_enhanced_node_parser()])
+def test_compact_chunks_get_their_own_doc_key(node_parser):
+    chunks = process_document_batch(make_batch(50), node_parser, compact_metadata=True)
+
+    for chunk in chunks:
+        assert chunk.metadata['doc_key'] == make_doc_key(source_of(chunk))
+        metadata = rehydrate_metadata(chunk.metadata)
+        assert metadata['source'] == source_of(chunk)
+        assert {key: metadata[key] for key in SECTION_KEYS} == detect_semantic_sections(chunk.text)
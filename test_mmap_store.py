@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import (
+    ExactMatchFilter,
+    MetadataFilter,
+    MetadataFilters,
+    FilterOperator,
+    VectorStoreQuery,
+)
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+from mmap_store import MmapVectorStore
+
+DIM = 128
+NUM_NODES = 5000
+NUM_DOCS = 10
+
+def make_nodes(embeddings):
+    return [
+        TextNode(
+            id_=f"node-{i}",
+            text=f"text {i}",
+            metadata={"i": i, "doc": f"doc-{i % NUM_DOCS}"},
+            embedding=embedding.tolist(),
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{i % NUM_DOCS}")},
+        )
+        for i, embedding in enumerate(embeddings)
+    ]
+
+def brute_force_top_k(embeddings, query, k):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    top = np.argsort(-scores)[:k]
+    return top, scores[top]
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(NUM_NODES, DIM)).astype(np.float32)
+
+@pytest.fixture
+def store(tmp_path, embeddings):
+    # A small block size forces the top-k to be merged across blocks
+    store = MmapVectorStore(persist_dir=str(tmp_path), block_size=512)
+    store.add(make_nodes(embeddings))
+    return store
+
+@pytest.mark.parametrize("quantization", ["none", "int8", "binary"])
+def test_query_matches_brute_force(store, embeddings, quantization):
+    # Uses each mode's default rescore multiplier, with shortlists smaller than the store
+    store.quantization = quantization
+    query = np.random.default_rng(1).normal(size=DIM)
+
+    result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=10))
+
+    expected_rows, expected_scores = brute_force_top_k(embeddings, query, 10)
+    assert result.ids == [f"node-{row}" for row in expected_rows]
+    assert np.allclose(result.similarities, expected_scores, atol=1e-5)
+    assert [node.metadata["i"] for node in result.nodes] == expected_rows.tolist()
+
+def test_delete_keeps_rows_and_metadata_aligned(store, embeddings, tmp_path):
+    store.delete("doc-3")
+
+    assert store.count() == NUM_NODES - NUM_NODES // NUM_DOCS
+    kept = np.array([i for i in range(NUM_NODES) if i % NUM_DOCS != 3])
+    store.quantization = "none"
+    for i in kept[::97]:
+        result = store.query(VectorStoreQuery(query_embedding=embeddings[i].tolist(), similarity_top_k=1))
+        assert result.ids == [f"node-{i}"]
+        assert result.nodes[0].metadata["i"] == i
+        assert result.nodes[0].get_content() == f"text {i}"
+
+    # A second instance opened on the same directory sees the same version
+    reopened = MmapVectorStore(persist_dir=str(tmp_path), quantization="none")
+    assert reopened.count() == store.count()
+
+def test_readers_pick_up_new_generation(store, embeddings, tmp_path):
+    reader = MmapVectorStore(persist_dir=str(tmp_path), quantization="none")
+    assert reader.count() == NUM_NODES
+
+    store.delete("doc-0")
+
+    assert reader.count() == NUM_NODES - NUM_NODES // NUM_DOCS
+    result = reader.query(VectorStoreQuery(query_embedding=embeddings[11].tolist(), similarity_top_k=1))
+    assert result.ids == ["node-11"]
+
+def test_exact_match_filters(store, embeddings):
+    query = np.random.default_rng(2).normal(size=DIM)
+    filters = MetadataFilters(filters=[ExactMatchFilter(key="doc", value="doc-4")])
+
+    result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=5, filters=filters))
+
+    rows = np.arange(4, NUM_NODES, NUM_DOCS)
+    expected_rows, _ = brute_force_top_k(embeddings[rows], query, 5)
+    assert result.ids == [f"node-{rows[row]}" for row in expected_rows]
+
+def test_unsupported_filters_raise(store):
+    filters = MetadataFilters(filters=[MetadataFilter(key="i", value=3, operator=FilterOperator.GT)])
+    with pytest.raises(ValueError):
+        store.query(VectorStoreQuery(query_embedding=[1.0] * DIM, similarity_top_k=5, filters=filters))
+
+class FakeChromaCollection:
+    """Serves nodes the way ChromaVectorStore stores them."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def count(self):
+        return len(self.nodes)
+
+    def get(self, include, limit, offset):
+        batch = self.nodes[offset:offset + limit]
+        return {
+            "ids": [node.node_id for node in batch],
+            "documents": [node.get_content() for node in batch],
+            "metadatas": [node_to_metadata_dict(node, remove_text=True, flat_metadata=True) for node in batch],
+            "embeddings": [node.embedding for node in batch],
+        }
+
+def test_from_chroma_collection_round_trip(tmp_path, embeddings):
+    nodes = make_nodes(embeddings[:250])
+    store = MmapVectorStore.from_chroma_collection(
+        FakeChromaCollection(nodes), persist_dir=str(tmp_path), batch_size=100, quantization="none"
+    )
+
+    assert store.count() == 250
+    result = store.query(VectorStoreQuery(query_embedding=embeddings[42].tolist(), similarity_top_k=1))
+    assert result.ids == ["node-42"]
+    assert result.nodes[0].metadata == {"i": 42, "doc": "doc-2"}
+    assert result.nodes[0].ref_doc_id == "doc-2"
+
+    store.delete("doc-2")
+    assert store.count() == 225